@@ -27,16 +27,34 @@ SOFTWARE.
 
 import os
 import sys
+import re
+import glob
+import shlex
 import argparse
 import filecmp
+import shutil
 import subprocess
+import signal
+import threading
 import datetime
+import contextlib
+from dataclasses import dataclass
+import functools
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
 from timeit import default_timer as timer
 from datetime import timedelta
 from pathlib import Path, PosixPath
 
 SCRIPTDIR = os.path.abspath(os.path.dirname(__file__))
 
+TB_EXTENSIONS = (".v", ".sv")
+
+# Set in a job process by a Ctrl-C, to not start any new command
+INTERRUPTED = threading.Event()
+
+INCLUDE_RE = re.compile(rb'`include\s+"([^"]+)"')
+
 def check_arguments(args):
     """
     Verify the arguments are correctly setup
@@ -67,6 +85,14 @@ def check_arguments(args):
         print("ERROR: Both compile-only and run-only are used")
         sys.exit(1)
 
+    if args.jobs is not None and args.jobs < 1:
+        print_event("ERROR: jobs must be a positive number")
+        sys.exit(1)
+
+    if args.threads is not None and args.threads < 1:
+        print_event("ERROR: threads must be a positive number")
+        sys.exit(1)
+
     if (args.compile_only or args.run_only) and args.test=="all":
         print_event("ERROR: compile-only or run-only can't be used with multiple testbenchs")
         sys.exit(1)
@@ -74,15 +100,87 @@ def check_arguments(args):
     return 0
 
 
+def check_inputs(args):
+    """
+    Verify the dot files and include folders exist before running
+    any simulator
+    """
+
+    errors = ["dot file " + dot + " not found" for dot in args.dotfile
+              if not os.path.isfile(dot)]
+    errors += ["include folder " + inc + " not found" for inc in args.include
+               if not os.path.isdir(inc)]
+
+    if errors:
+        for error in errors:
+            print("ERROR: " + error)
+        sys.exit(1)
+
+    # Verilator builds in build_<testbench>_<hash>, a main file copied from an
+    # older template still includes the model header from build/
+    if "verilator" in args.simulator and os.path.isfile(args.main):
+        # Only a hint, an unreadable main file is reported by the C++ build
+        try:
+            with open(args.main, encoding="utf-8", errors="replace") as main:
+                if re.search(r'#include\s+"build/V', main.read()):
+                    print("WARNING: " + args.main + " includes the model header from build/, "
+                          "include it by its name only, like #include \"Vmy_testbench.h\"")
+        except OSError:
+            pass
+
+    return 0
+
+
 def check_tb_extension(test : PosixPath):
     """
     Check the extension to be sure it can be run
     """
-    if test.suffix not in [".v",".sv"]:
+    if test.suffix.lower() not in TB_EXTENSIONS:
         print("ERROR: Failed to find supported extension. Must use either *.v or *.sv")
         sys.exit(1)
 
 
+def set_threads(args):
+    """
+    Set the Verilator threads, and warn if the testbenchs executed in
+    parallel use more threads than CPUs, Verilator threads spinning while
+    waiting for work. The default doesn't depend on the testbenchs of the
+    run, the threads being part of the build cache key
+    """
+
+    cpus = os.cpu_count() or 1
+    workers = min(args.jobs or cpus, len(args.test))
+
+    if args.threads is None:
+        args.threads = max(1, min(4, cpus))
+
+    if "verilator" in args.simulator and workers * args.threads > cpus:
+        print("WARNING: " + str(workers) + " jobs of " + str(args.threads) +
+              " threads run on " + str(cpus) + " CPUs, reduce -jobs or -threads")
+
+    return 0
+
+
+def check_test_names(tests):
+    """
+    Verify two testbenchs don't share the same name, their logs and
+    executables being named after it
+    """
+
+    names = {}
+    for test in tests:
+        names.setdefault(test.stem, []).append(str(test))
+
+    duplicates = [paths for paths in names.values() if len(paths) > 1]
+
+    if duplicates:
+        for paths in duplicates:
+            print("ERROR: Testbenchs with the same name: " + " ".join(paths))
+        sys.exit(1)
+
+    return 0
+
+
 def copy_svut_h():
     """
     First copy svut_h.sv macro in the user folder if not present or different
@@ -98,10 +196,12 @@ def copy_svut_h():
 
     curr_hfile = os.getcwd() + "/svut_h.sv"
 
+    # filecmp first compares size and mtime and only reads the files if they
+    # differ. The copy keeps the mtime so the next runs stop at the stat
     if (not os.path.isfile(curr_hfile)) or\
             (not filecmp.cmp(curr_hfile, org_hfile)):
         print("INFO: Copy up-to-date version of svut_h.sv")
-        os.system("cp " + org_hfile + " " + os.getcwd())
+        shutil.copy2(org_hfile, curr_hfile)
 
     return 0
 
@@ -112,28 +212,28 @@ def find_unit_tests(test_dir : PosixPath):
     and return a list of available tests
     """
 
-    supported_prefix = ["tb_", "ts_", "testbench_", "testsuite_", "unit_test_"]
-    supported_suffix = ["_unit_test", "_testbench","_testsuite", "_tb", "_ts"]
+    supported_prefix = ("tb_", "ts_", "testbench_", "testsuite_", "unit_test_")
+    supported_suffix = ("_unit_test", "_testbench","_testsuite", "_tb", "_ts")
     files = []
 
-    # Parse the current folder
-    for path in Path(test_dir).iterdir():
-        # Check only the files
-        if not path.is_file():
-            continue
+    # Parse the folder. scandir entries cache the file type returned
+    # by the directory listing, so is_file() doesn't stat each file
+    with os.scandir(test_dir) as entries:
+        for entry in entries:
+            # Check only the files
+            if not entry.is_file():
+                continue
 
-        # Files not ending with .sv or .v are skipped
-        if path.suffix not in [".sv",".v"]:
-            continue
+            stem, ext = os.path.splitext(entry.name)
 
-        if path.stem.startswith(tuple(supported_prefix)):
-            files.append(path)
+            # Files not ending with .sv or .v are skipped
+            if ext.lower() not in TB_EXTENSIONS:
+                continue
 
-        if path.stem.endswith(tuple(supported_suffix)):
-            files.append(path)
+            if stem.startswith(supported_prefix) or stem.endswith(supported_suffix):
+                files.append(Path(entry.path))
 
-    # Remove duplicated file if contains both prefix and suffix
-    files = list(set(files))
+    files.sort()
 
     if not files:
         print("ERROR: Can't find tests to run")
@@ -172,119 +272,368 @@ def helper(tag):
 
 def get_defines(defines):
     """
-    Return a string with the list of defines ready to drop in icarus
+    Return the list of defines ready to drop in icarus or verilator
     """
-    simdefs = ""
 
     if not defines:
-        return simdefs
+        return []
 
-    defs = defines.split(';')
+    # Each define is passed as a single argument, so spaces around the
+    # separators would end up in the macro name
+    defs = [_def.strip() for _def in defines.split(';')]
 
-    for _def in defs:
-        if _def:
-            simdefs += "-D" + _def + " "
+    return ["-D" + _def for _def in defs if _def]
 
-    return simdefs
 
+def parse_dotfile(dotfile, relative=False, visited=None):
+    """
+    Return the files, the include folders, the library folders and the
+    library extensions listed in a dot file, nested dot files included.
+    With relative, the paths are relative to the dot file folder (-F)
+    """
+
+    deps = {"files": [], "incdirs": [], "libdirs": [], "libexts": []}
 
-def create_iverilog(args, test):
+    visited = set() if visited is None else visited
+    visited.add(os.path.abspath(dotfile))
+
+    root = os.path.dirname(dotfile) if relative else ""
+
+    def resolve(path):
+        return os.path.join(root, os.path.expandvars(path))
+
+    # Comments can be written in any encoding, like Latin-1
+    with open(dotfile, encoding="utf-8", errors="replace") as dot:
+        lines = [line.split("//")[0].strip() for line in dot]
+
+    # Options taking an argument can be written on one or two lines
+    words = " ".join(lines).split()
+
+    for i, word in enumerate(words):
+
+        prev = words[i-1] if i else ""
+
+        if word.startswith("+incdir+"):
+            deps["incdirs"] += [resolve(inc) for inc in word[len("+incdir+"):].split("+") if inc]
+        elif word.startswith("+libext+"):
+            deps["libexts"] += [ext for ext in word[len("+libext+"):].split("+") if ext]
+        elif word.startswith("-I") and len(word) > 2:
+            deps["incdirs"].append(resolve(word[2:]))
+        elif word.startswith(("+", "-")):
+            continue
+        elif prev in ("-f", "-F"):
+            nested = resolve(word)
+            deps["files"].append(nested)
+            if os.path.isfile(nested) and os.path.abspath(nested) not in visited:
+                for name, values in parse_dotfile(nested, prev == "-F", visited).items():
+                    deps[name] += values
+        elif prev == "-I":
+            deps["incdirs"].append(resolve(word))
+        elif prev == "-y":
+            deps["libdirs"].append(resolve(word))
+        elif prev == "-Y":
+            deps["libexts"].append(word)
+        else:
+            deps["files"].append(resolve(word))
+
+    return deps
+
+
+def get_library_files(libdirs, libexts):
     """
-    Create the Icarus Verilog command to launch the simulation
+    Return the modules the simulators can pick in the library folders
     """
 
-    cmds = []
+    exts = tuple(libexts) if libexts else TB_EXTENSIONS
+    files = []
 
-    if not os.path.isfile("svut.out"):
-        print_event("Testbench executable not found. Will build it")
-        args.run_only = False
+    for libdir in libdirs:
+        if os.path.isdir(libdir):
+            files += sorted(os.path.join(libdir, name) for name in os.listdir(libdir)
+                            if name.endswith(exts))
 
-    # Build testbench executable
-    if not args.run_only:
+    return files
 
-        cmd = "iverilog -g2012 -Wall -o svut.out "
 
-        if args.define:
-            cmd += get_defines(args.define)
+@dataclass(frozen=True)
+class CommonFlags:
+    """
+    Simulator flags and sources shared by all the testbenchs of a run
+    """
 
-        if args.dotfile:
+    defines: tuple
+    dotfiles: tuple
+    includes_iverilog: tuple
+    includes_verilator: tuple
+    sources: tuple
+    incdirs: tuple
 
-            dotfiles = ""
 
-            for dot in args.dotfile:
-                if os.path.isfile(dot):
-                    dotfiles += dot + " "
+def get_common_flags(args):
+    """
+    Parse once the defines, dot files and include folders of the run
+    """
 
-            if dotfiles:
-                cmd += "-f " + dotfiles + " "
+    dotfiles = []
+    sources = []
+    incdirs = list(args.include)
+    libdirs = []
+    libexts = []
 
-        if args.include:
-            incs = " ".join(args.include)
-            cmd += "-I " + incs + " "
+    for dot in args.dotfile:
 
-        cmd += test + " "
-        cmds.append(cmd)
+        dotfiles += ["-f", dot]
+        deps = parse_dotfile(dot)
+        sources += [dot] + deps["files"]
+        incdirs += deps["incdirs"]
+        libdirs += deps["libdirs"]
+        libexts += deps["libexts"]
+
+    sources += get_library_files(libdirs, libexts)
+
+    includes_iverilog = []
+    for inc in args.include:
+        includes_iverilog += ["-I", inc]
+
+    return CommonFlags(
+        defines=tuple(get_defines(args.define)),
+        dotfiles=tuple(dotfiles),
+        includes_iverilog=tuple(includes_iverilog),
+        includes_verilator=tuple("+incdir+" + inc for inc in args.include),
+        sources=tuple(sources),
+        incdirs=tuple(incdirs),
+    )
+
+
+def get_sources(flags, test):
+    """
+    Return the list of files the testbench build depends on: the testbench,
+    the dot files and the files they list, and all the files they include
+    """
+
+    files = [test] + list(flags.sources)
+    incdirs = flags.incdirs
+
+    sources = []
+
+    while files:
+
+        source = os.path.abspath(files.pop(0))
+
+        if source in sources:
+            continue
+
+        sources.append(source)
+
+        if not os.path.isfile(source):
+            continue
+
+        with open(source, "rb") as src:
+            includes = INCLUDE_RE.findall(src.read())
+
+        # Resolve the included files like the simulators, first from the
+        # including file folder, then from the include folders
+        for inc in includes:
+            inc = inc.decode(errors="replace")
+            paths = [os.path.join(os.path.dirname(source), inc)]
+            paths += [os.path.join(incdir, inc) for incdir in incdirs] + [inc]
+            files += [path for path in paths if os.path.isfile(path)][:1]
+
+    return sources
+
+
+def get_cache_key(cmd, sources):
+    """
+    Return a SHA-256 digest of a build command and of the content of its
+    sources, used to find back a testbench executable already built.
+    Sources are hashed by absolute path, so the key doesn't depend on how
+    they were passed
+    """
+
+    sha = hashlib.sha256("\0".join(cmd).encode())
+
+    for source in sources:
+
+        source = os.path.abspath(source)
+        sha.update(b"\0" + source.encode() + b"\0")
+
+        if not os.path.isfile(source):
+            continue
+
+        with open(source, "rb") as src:
+            for chunk in iter(functools.partial(src.read, 1 << 16), b""):
+                sha.update(chunk)
+
+    return sha.hexdigest()
+
+
+def get_build_pattern(prefix, testname, suffix=""):
+    """
+    Return a glob pattern matching all the cached builds of a testbench
+    """
+
+    return glob.escape(prefix + testname + "_") + "[0-9a-f]" * 16 + glob.escape(suffix)
+
+
+def remove_stale_builds(pattern, keep):
+    """
+    Remove the cached builds of a testbench, except the one just done
+    """
+
+    for path in glob.glob(pattern):
+
+        if os.path.normpath(path) == os.path.normpath(keep):
+            continue
+
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            os.remove(path)
+
+
+def find_last_build(pattern, executable=""):
+    """
+    Return the most recent executable among the cached builds of a
+    testbench, None if it has never been built
+    """
+
+    paths = [os.path.join(path, executable) if executable else path
+             for path in glob.glob(pattern)]
+    paths = [path for path in paths if os.path.isfile(path)]
+
+    return max(paths, key=os.path.getmtime, default=None)
+
+
+def write_cache_key(keyfile, key):
+    """
+    Store the cache key of a testbench executable once built
+    """
+
+    with open(keyfile, "w", encoding="utf-8") as kfile:
+        kfile.write(key)
+
+
+def create_iverilog(args, flags, test : PosixPath):
+    """
+    Create the Icarus Verilog commands to launch the simulation
+    """
+
+    testname = test.stem
+    prefix = os.path.join(".svut_cache", "icarus_")
+
+    # Run the last executable built, whatever the sources became since
+    if args.run_only:
+        output = find_last_build(get_build_pattern(prefix, testname, ".out"))
+        if output:
+            print_event("Run last testbench executable built " + output)
+            return [["vvp", *shlex.split(args.vpi), output]]
+        print_event("Testbench executable not found. Will build it")
+
+    cmds = []
+
+    cmd = ["iverilog", "-g2012", "-Wall", *flags.defines, *flags.dotfiles,
+           *flags.includes_iverilog, str(test)]
+
+    # Like the Verilator build folder, the executable is named after the
+    # sources and the flags so it can be executed as is if already built.
+    # The testbench path is left out of the flags, its absolute path being
+    # hashed along the sources
+    key = get_cache_key(cmd[:-1], get_sources(flags, str(test)))
+    output = prefix + testname + "_" + key[:16] + ".out"
+
+    # Build testbench executable
+    if os.path.isfile(output):
+        print_event("Testbench executable up-to-date in " + output)
+
+    else:
+
+        if not args.dry:
+            os.makedirs(".svut_cache", exist_ok=True)
+
+        # Build under a temporary name so an interrupted build is never
+        # taken for a cached executable
+        tmp = output + ".tmp"
+        cmds.append(cmd[:3] + ["-o", tmp] + cmd[3:])
+        cmds.append(functools.partial(os.replace, tmp, output))
+        cmds.append(functools.partial(remove_stale_builds,
+                                      get_build_pattern(prefix, testname, ".out") + "*", output))
 
     # Execute testbench
     if not args.compile_only:
 
-        cmd = "vvp "
+        cmd = ["vvp"]
         if args.vpi:
-            cmd += args.vpi + " "
+            cmd += shlex.split(args.vpi)
 
-        cmd += "svut.out "
+        cmd.append(output)
         cmds.append(cmd)
 
     return cmds
 
 
-def create_verilator(args, test):
+def create_verilator(args, flags, test : PosixPath):
     """
-    Create the Verilator command to launch the simulation
+    Create the Verilator commands to launch the simulation
     """
 
-    testname = os.path.basename(test).split(".")[0]
-
-    cmds = []
-
-    if not os.path.isfile("build/V" + testname + ".mk"):
+    testname = test.stem
+
+    # Run the last executable built, whatever the sources became since. Only
+    # builds done up to the end have their key file
+    if args.run_only:
+        executable = find_last_build(get_build_pattern("build_", testname), "svut.key")
+        if executable:
+            executable = os.path.join(os.path.dirname(executable), "V" + testname)
+        if executable and os.path.isfile(executable):
+            print_event("Run last testbench executable built " + executable)
+            return [[executable]]
         print_event("Testbench executable not found. Will build it")
-        args.run_only = False
-
 
-    # Build testbench executable
-    if not args.run_only:
+    cmds = []
 
-        cmd = """verilator -Wall --trace --Mdir build +1800-2012ext+sv """
-        cmd += """+1800-2005ext+v -Wno-STMTDLY -Wno-UNUSED -Wno-UNDRIVEN -Wno-PINCONNECTEMPTY """
-        cmd += """-Wpedantic -Wno-VARHIDDEN -Wno-lint """
+    cmd = ["+1800-2012ext+sv", "+1800-2005ext+v", "-Wno-STMTDLY", "-Wno-UNUSED",
+           "-Wno-UNDRIVEN", "-Wno-PINCONNECTEMPTY", "-Wpedantic", "-Wno-VARHIDDEN",
+           "-Wno-lint", *flags.defines, *flags.dotfiles, *flags.includes_verilator]
 
-        if args.define:
-            cmd += get_defines(args.define)
+    cmd += ["--threads", str(args.threads), "-cc", "--exe", "--build",
+            "--top-module", testname, str(test), args.main]
 
-        if args.dotfile:
+    # The build folder is named after the sources and the flags, so an
+    # executable built once with the same inputs can be executed as is.
+    # The testbench and main paths are left out of the flags, their absolute
+    # paths being hashed along the sources
+    key = get_cache_key(cmd[:-2], get_sources(flags, str(test)) + [args.main])
+    builddir = "build_" + testname + "_" + key[:16]
+    keyfile = os.path.join(builddir, "svut.key")
+    executable = os.path.join(builddir, "V" + testname)
 
-            dotfiles = ""
+    cached = False
+    if os.path.isfile(executable) and os.path.isfile(keyfile):
+        with open(keyfile, encoding="utf-8") as kfile:
+            cached = kfile.read() == key
 
-            for dot in args.dotfile:
-                if os.path.isfile(dot):
-                    dotfiles += dot + " "
+    # Build testbench executable
+    if cached:
+        print_event("Testbench executable up-to-date in " + builddir)
 
-            if dotfiles:
-                cmd += "-f " + dotfiles + " "
+    else:
 
-        if args.include:
-            for inc in args.include:
-                cmd += "+incdir+" + inc + " "
+        # The key is written once the build succeeded, so an interrupted
+        # build is never taken for a cached executable
+        if not args.dry:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(keyfile)
 
-        cmd += "-cc --exe --build -j --top-module " + testname + " "
-        cmd += test + " " + args.main
-        cmds.append(cmd)
+        # The build parallelism doesn't change the model, it's not hashed
+        cmds.append(["verilator", "-Wall", "--trace", "--Mdir", builddir, "-j", str(args.threads)]
+                    + cmd)
+        cmds.append(functools.partial(write_cache_key, keyfile, key))
+        cmds.append(functools.partial(remove_stale_builds,
+                                      get_build_pattern("build_", testname), builddir))
 
     # Execution command
     if not args.compile_only:
-        cmd = "build/V" + testname
-        cmds.append(cmd)
+        cmds.append([executable])
 
     return cmds
 
@@ -295,31 +644,175 @@ def print_event(event):
     TODO: manage severity/verbosity level
     """
 
-    time = datetime.datetime.now().time().strftime('%H:%M:%S')
+    time = datetime.datetime.now().strftime('%H:%M:%S')
 
-    print("SVUT (@ " + time + ") " + event, flush=True)
-    print("")
+    # A single write keeps the event and its blank line together
+    # when several testbenchs print at the same time
+    sys.stdout.write("SVUT (@ " + time + ") " + event + "\n\n")
+    sys.stdout.flush()
 
     return 0
 
 
+@functools.lru_cache(maxsize=1)
 def get_git_tag():
     """
     Return current SVUT version
     """
 
-    curr_path = os.getcwd()
-    os.chdir(SCRIPTDIR)
-
     try:
-        git_tag = subprocess.check_output(["git", "describe", "--tags", "--abbrev=0"])
-        git_tag = git_tag.strip().decode('ascii')
-    except subprocess.CalledProcessError as err:
+        ret = subprocess.run(["git", "describe", "--tags", "--abbrev=0"], cwd=SCRIPTDIR,
+                             capture_output=True, text=True, check=False)
+    except OSError:
+        ret = None
+
+    if not ret or ret.returncode:
         print("WARNING: Can't get last git tag. Will return v0.0.0")
-        git_tag = "v0.0.0"
+        return "v0.0.0"
+
+    return ret.stdout.strip()
+
+
+class TestLog:
+    """
+    Write the output of a testbench in its log file, if any, and in the
+    terminal when streaming, each line prefixed by the testbench name in
+    verbose mode
+    """
+
+    def __init__(self, log, term, prefix=None):
+        self.log = log
+        self.term = sys.stdout if term else None
+        self.prefix = "[" + prefix + "] " if prefix else ""
+        self.pending = ""
+
+    def write(self, text):
+        """
+        Write a chunk of output, which may hold several or partial lines
+        """
+
+        if self.log:
+            self.log.write(text)
+
+        # Complete lines are written at once, so lines of testbenchs
+        # running in parallel don't mix in the terminal
+        if self.term:
+            lines = (self.pending + text).split("\n")
+            self.pending = lines.pop()
+            if lines:
+                self.term.write("".join(self.prefix + line + "\n" for line in lines))
+                self.term.flush()
+
+        return len(text)
+
+    def flush(self):
+        """
+        Flush both the log file and the terminal
+        """
+
+        if self.log:
+            self.log.flush()
+        if self.term:
+            if self.pending:
+                self.term.write(self.prefix + self.pending)
+                self.pending = ""
+            self.term.flush()
+
+
+def run_logged(cmd, log : TestLog):
+    """
+    Execute a command, streaming its stdout and stderr in a testbench log.
+    The output read through a pipe is buffered by the simulators, it comes
+    by blocks unless the testbench flushes it.
+    Return the command return code
+    """
+
+    try:
+        # No input, vvp interrupted by a Ctrl-C would wait for its interactive prompt
+        proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                stderr=subprocess.STDOUT)
+    except OSError as err:
+        print("ERROR: " + str(err), flush=True)
+        return 1
+
+    with proc:
+        for line in proc.stdout:
+            log.write(line.decode(errors="replace"))
+
+    log.flush()
+
+    return proc.returncode
+
+
+def catch_interrupt():
+    """
+    Let a Ctrl-C stop the simulators of a job and the main process stop the
+    run, without a traceback per job. A Python handler, unlike SIG_IGN, isn't
+    inherited by the commands executed
+    """
+
+    signal.signal(signal.SIGINT, lambda signum, frame: INTERRUPTED.set())
+
+
+def run_one(test : PosixPath, args, flags : CommonFlags):
+    """
+    Build and execute a testbench, logging its output in logs/<testname>.log.
+    Return 1 if a command failed, 0 otherwise
+    """
+
+    cmdret = 0
+
+    with contextlib.ExitStack() as stack:
+
+        # A dry run only prints the commands, it doesn't write any log
+        logfile = None
+        if not args.dry:
+            os.makedirs("logs", exist_ok=True)
+            logfile = stack.enter_context(open(os.path.join("logs", test.stem + ".log"), "w",
+                                               encoding="utf-8"))
+
+        log = TestLog(logfile, args.verbose or args.jobs == 1,
+                      test.stem if args.verbose else None)
+        stack.enter_context(contextlib.redirect_stdout(log))
+
+        if "iverilog" in args.simulator or "icarus" in args.simulator:
+            cmds = create_iverilog(args, flags, test)
+
+        else:
+            cmds = create_verilator(args, flags, test)
+
+        print_event("Start " + test.name)
+
+        # Execute commands one by one
+        for cmd in cmds:
+
+            # The jobs already queued when the run is interrupted don't start
+            if INTERRUPTED.is_set():
+                cmdret = 1
+                break
+
+            # Steps done in Python, like storing an executable in the cache
+            if callable(cmd):
+                try:
+                    if not args.dry:
+                        cmd()
+                except OSError as err:
+                    cmdret = 1
+                    print("ERROR: " + str(err), flush=True)
+                    break
+                continue
+
+            print_event(" ".join(cmd))
+
+            if not args.dry and run_logged(cmd, log):
+                cmdret = 1
+                print("ERROR: Command failed: " + " ".join(cmd), flush=True)
+                break
+
+        print_event("Stop " + test.name)
+
+    return cmdret
 
-    os.chdir(curr_path)
-    return git_tag
 
 def get_test_dir(input: list) -> PosixPath:
     if len(input) == 1 and input[0].is_dir():
@@ -328,9 +821,9 @@ def get_test_dir(input: list) -> PosixPath:
     return None
 
 
-def main():
+def parse_arguments():
     """
-    Main function
+    Parse the command line arguments
     """
 
     parser = argparse.ArgumentParser(description='SystemVerilog Unit Test Flow')
@@ -351,7 +844,7 @@ def main():
 
     # Simulator options
 
-    parser.add_argument('-f', dest='dotfile', type=str, default=["files.f"], nargs="*",
+    parser.add_argument('-f', dest='dotfile', type=str, default=None, nargs="*",
                         help="A dot file (*.f) with incdir, define and file path")
 
     parser.add_argument('-include', dest='include', type=str, nargs="*",
@@ -360,6 +853,10 @@ def main():
     parser.add_argument('-main', dest='main', type=str, default="sim_main.cpp",
                         help='Verilator main cpp file, like sim_main.cpp')
 
+    parser.add_argument('-threads', dest='threads', type=int, default=None,
+                        help='Verilator (only) threads used to build and to execute the model. '
+                             'Default is the number of CPUs, up to 4')
+
     parser.add_argument('-define', dest='define', type=str, default="",
                         help='''A list of define separated by ; \
                             ex: -define "DEF1=2;DEF2;DEF3=3"''')
@@ -371,7 +868,8 @@ def main():
     # SVUT Execution options
 
     parser.add_argument('-run-only', dest='run_only', default=False, action='store_true',
-                        help='Only run existing executable but build it if not present')
+                        help='Only run the last executable built, even if the sources changed '
+                             'since, but build it if not present')
 
     parser.add_argument('-compile-only', dest='compile_only', default=False, action='store_true',
                         help='Only prepare the testbench executable')
@@ -379,10 +877,27 @@ def main():
     parser.add_argument('-dry-run', dest='dry', default=False, action='store_true',
                         help='Just print the command, don\'t execute')
 
+    parser.add_argument('-verbose', dest='verbose', default=False, action='store_true',
+                        help='Print the testbenchs output while they run, prefixed by their name. '
+                             'The simulators buffer it, it can show up by blocks')
+
+    parser.add_argument('-jobs', '-j', dest='jobs', type=int, default=os.cpu_count(),
+                        help='Number of testbenchs to build and execute in parallel')
+
 
     args = parser.parse_args()
     args.test = [Path(x) for x in args.test]
 
+    return args
+
+
+def main():
+    """
+    Main function
+    """
+
+    args = parse_arguments()
+
     git_tag = get_git_tag()
 
     if args.version:
@@ -408,35 +923,62 @@ def main():
     # Copy svut_h.sv if not present or not up-to-date
     copy_svut_h()
 
-    cmdret = 0
+    # files.f is used by default only if present
+    if args.dotfile is None:
+        args.dotfile = ["files.f"] if os.path.isfile("files.f") else []
 
-    start = timer()
+    check_inputs(args)
+
+    flags = get_common_flags(args)
+
+    cmdret = 0
 
     test : PosixPath
     for test in args.test:
-
         check_tb_extension(test)
 
-        if "iverilog" in args.simulator or "icarus" in args.simulator:
-            cmds = create_iverilog(args, str(test))
+    check_test_names(args.test)
 
-        elif "verilator" in args.simulator:
-            cmds = create_verilator(args, str(test))
+    set_threads(args)
 
-        print_event("Start " + test.name)
+    start = timer()
 
-        # Execute commands one by one
-        for cmd in cmds:
+    # Testbenchs are built and executed concurrently, each one in its own
+    # process. Unless in verbose mode or executed one by one, logs are
+    # printed in order once a testbench is over
+    if args.dry or len(args.test) == 1:
+        args.jobs = 1
 
-            print_event(cmd)
+    jobs = []
+    interrupted = False
 
-            if not args.dry:
-                if os.system(cmd):
-                    cmdret += 1
-                    print("ERROR: Command failed: " + cmd)
-                    break
+    with ProcessPoolExecutor(max_workers=args.jobs, initializer=catch_interrupt) as executor:
 
-        print_event("Stop " + test.name)
+        try:
+            for test in args.test:
+                jobs.append((test, executor.submit(run_one, test, args, flags)))
+
+            for test, job in jobs:
+
+                cmdret += job.result()
+
+                if args.verbose or args.jobs == 1:
+                    continue
+
+                with open(os.path.join("logs", test.stem + ".log"), encoding="utf-8") as log:
+                    sys.stdout.write(log.read())
+                    sys.stdout.flush()
+
+        # The running jobs stop with their simulator, the pending ones are dropped
+        except KeyboardInterrupt:
+            interrupted = True
+            for _, job in jobs:
+                job.cancel()
+
+    if interrupted:
+        print()
+        print("ERROR: Run interrupted")
+        sys.exit(130)
 
     end = timer()
     print_event("Elapsed time: " + str(timedelta(seconds=end-start)))
@@ -52,3 +52,200 @@ test_run_dry_run() { #@test
     run "$DIR/../svut/svutRun.py" "-test" "../example/ffd_testbench.sv" "-dry-run"
     [ "$status" -eq 0 ]
 }
+
+test_run_dry_run_jobs() { #@test
+
+    run "$DIR/../svut/svutRun.py" "-test" "../example/ffd_testbench.sv" "-dry-run" "-jobs" "2"
+    [ "$status" -eq 0 ]
+}
+
+test_run_wrong_jobs() { #@test
+
+    run "$DIR/../svut/svutRun.py" "-test" "../example/ffd_testbench.sv" "-jobs" "0"
+    [ "$status" -eq 1 ]
+}
+
+test_run_dry_run_verbose() { #@test
+
+    run "$DIR/../svut/svutRun.py" "-test" "../example/ffd_testbench.sv" "-dry-run" "-verbose"
+    [ "$status" -eq 0 ]
+}
+
+test_run_missing_dotfile() { #@test
+
+    run "$DIR/../svut/svutRun.py" "-test" "../example/ffd_testbench.sv" "-dry-run" "-f" "missing.f"
+    [ "$status" -eq 1 ]
+}
+
+test_run_dotfile_latin_comment() { #@test
+
+    printf -- "// r\xe9glages\n+define+FOO=1\n" > latin.f
+    run "$DIR/../svut/svutRun.py" "-test" "../example/ffd_testbench.sv" "-dry-run" "-f" "latin.f"
+    rm -f latin.f
+    [ "$status" -eq 0 ]
+}
+
+test_run_main_latin_comment() { #@test
+
+    printf -- '// r\xe9glages\n#include "build/Vffd_testbench.h"\n' > latin.cpp
+    run "$DIR/../svut/svutRun.py" "-test" "../example/ffd_testbench.sv" "-dry-run" "-sim" "verilator" "-main" "latin.cpp"
+    rm -f latin.cpp
+    [ "$status" -eq 0 ]
+    [[ "$output" == *"WARNING: latin.cpp includes the model header from build/"* ]]
+}
+
+test_run_duplicated_test_names() { #@test
+
+    mkdir -p dup
+    cp "$DIR/Adder_OK_testsuite.sv" dup/
+    run "$DIR/../svut/svutRun.py" "-test" "$DIR/Adder_OK_testsuite.sv" "dup/Adder_OK_testsuite.sv" "-dry-run"
+    rm -fr dup
+    [ "$status" -eq 1 ]
+}
+
+#------------------------------------------------------------------------------
+# Build cache. Each test works in a scratch folder holding the Adder testsuite
+#------------------------------------------------------------------------------
+
+function setup_cache() {
+    rm -fr cache && mkdir cache
+    cp "$DIR/Adder.v" "$DIR/Adder_OK_testsuite.sv" cache/
+}
+
+function run_cache() {
+    cd cache && "$DIR/../svut/svutRun.py" -test Adder_OK_testsuite.sv -define "MYDEF1=5;MYDEF2" "$@"
+}
+
+# Verilator model build can't run in CI, a stub builds a fake executable in --Mdir
+function setup_verilator_stub() {
+    mkdir -p cache/stub
+    cat > cache/stub/verilator <<'STUB'
+#!/usr/bin/env bash
+while [ $# -gt 0 ]; do
+    [ "$1" = "--Mdir" ] && mdir=$2
+    [ "$1" = "--top-module" ] && top=$2
+    shift
+done
+mkdir -p "$mdir" && printf '#!/bin/sh\n' > "$mdir/V$top" && chmod +x "$mdir/V$top"
+STUB
+    chmod +x cache/stub/verilator
+    export PATH="$PWD/cache/stub:$PATH"
+}
+
+test_run_cache_icarus_reuse() { #@test
+
+    setup_cache
+    run run_cache -compile-only
+    [ "$status" -eq 0 ]
+    run run_cache -compile-only
+    rm -fr cache
+    [ "$status" -eq 0 ]
+    [[ "$output" == *"up-to-date"* ]]
+}
+
+test_run_cache_icarus_included_file_changed() { #@test
+
+    setup_cache
+    run run_cache -compile-only
+    echo "// edited" >> cache/Adder.v
+    run run_cache -compile-only
+    rm -fr cache
+    [ "$status" -eq 0 ]
+    [[ "$output" != *"up-to-date"* ]]
+}
+
+test_run_cache_icarus_nested_dotfile_changed() { #@test
+
+    setup_cache
+    echo "-f inner.f" > cache/files.f
+    echo "+define+FOO=1" > cache/inner.f
+    run run_cache -compile-only
+    echo "+define+FOO=2" > cache/inner.f
+    run run_cache -compile-only
+    rm -fr cache
+    [ "$status" -eq 0 ]
+    [[ "$output" != *"up-to-date"* ]]
+}
+
+test_run_cache_icarus_library_changed() { #@test
+
+    setup_cache
+    mkdir cache/lib && mv cache/Adder.v cache/lib/
+    sed -i.bak '/include "Adder.v"/d' cache/Adder_OK_testsuite.sv
+    printf -- "-y lib\n+libext+.v\n" > cache/files.f
+    run run_cache -compile-only
+    [ "$status" -eq 0 ]
+    run run_cache -compile-only
+    [[ "$output" == *"up-to-date"* ]]
+    echo "// edited" >> cache/lib/Adder.v
+    run run_cache -compile-only
+    rm -fr cache
+    [ "$status" -eq 0 ]
+    [[ "$output" != *"up-to-date"* ]]
+}
+
+test_run_cache_icarus_run_only_last_build() { #@test
+
+    setup_cache
+    run run_cache -compile-only
+    echo "// edited" >> cache/Adder.v
+    run run_cache -run-only
+    rm -fr cache
+    [[ "$output" == *"Run last testbench executable built"* ]]
+}
+
+test_run_cache_verilator_reuse_and_rebuild() { #@test
+
+    setup_cache
+    setup_verilator_stub
+    run run_cache -sim verilator -compile-only
+    [ "$status" -eq 0 ]
+    run run_cache -sim verilator -compile-only
+    [[ "$output" == *"up-to-date"* ]]
+    echo "// edited" >> cache/Adder.v
+    run run_cache -sim verilator -compile-only
+    [ "$status" -eq 0 ]
+    [[ "$output" != *"up-to-date"* ]]
+    [ $(ls -d cache/build_Adder_OK_testsuite_* | wc -l) -eq 1 ]
+    rm -fr cache
+}
+
+test_run_cache_same_key_for_any_path() { #@test
+
+    setup_cache
+    setup_verilator_stub
+    # A folder scan passes the testbench by its absolute path
+    run bash -c "cd cache && $DIR/../svut/svutRun.py -sim verilator -compile-only -define 'MYDEF1=5;MYDEF2'"
+    [ "$status" -eq 0 ]
+    run run_cache -sim verilator -compile-only
+    rm -fr cache
+    [[ "$output" == *"up-to-date"* ]]
+}
+
+test_run_cache_same_key_alone_or_in_suite() { #@test
+
+    setup_cache
+    setup_verilator_stub
+    cp "$DIR/Adder_KO_testsuite.sv" cache/
+    run run_cache -sim verilator -compile-only
+    [ "$status" -eq 0 ]
+    run bash -c "cd cache && $DIR/../svut/svutRun.py -sim verilator -compile-only -jobs 2 -define 'MYDEF1=5;MYDEF2'"
+    rm -fr cache
+    [[ "$output" == *"up-to-date in build_Adder_OK_testsuite"* ]]
+}
+
+test_run_define_with_spaces() { #@test
+
+    run "$DIR/../svut/svutRun.py" "-test" "$DIR/Adder_OK_testsuite.sv" "-define" "MYDEF1=5; MYDEF2" "-dry-run"
+    [ "$status" -eq 0 ]
+    [[ "$output" == *"-DMYDEF1=5 -DMYDEF2 "* ]]
+}
+
+test_run_uppercase_extension() { #@test
+
+    mkdir -p upper
+    cp "$DIR/Adder_OK_testsuite.sv" upper/Adder_OK_testsuite.SV
+    run "$DIR/../svut/svutRun.py" "-test" "upper/Adder_OK_testsuite.SV" "-dry-run"
+    rm -fr upper
+    [ "$status" -eq 0 ]
+}